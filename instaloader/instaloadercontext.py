@@ -211,6 +211,15 @@ class InstaloaderContext:
         session.request = partial(session.request, timeout=self.request_timeout) # type: ignore
         return session
 
+    @contextmanager
+    def _session_copy(self):
+        """Copy of our session which shares its connection pools, so that each query does not need a new
+        TCP and TLS handshake. The copy is not closed, since the pools belong to ``self._session``."""
+        session = copy_session(self._session, self.request_timeout)
+        for prefix, adapter in self._session.adapters.items():
+            session.mount(prefix, adapter)
+        yield session
+
     def save_session(self):
         """Not meant to be used directly, use :meth:`Instaloader.save_session`."""
         return requests.utils.dict_from_cookiejar(self._session.cookies)
@@ -228,6 +237,10 @@ class InstaloaderContext:
         # Override default timeout behavior.
         # Need to silence mypy bug for this. See: https://github.com/python/mypy/issues/2427
         session.request = partial(session.request, timeout=self.request_timeout)  # type: ignore
+        # Keep the connection pools of the current session, mounted before the swap, so that no query
+        # runs on a pool-less session and the old pools are not left behind unclosed.
+        for prefix, adapter in self._session.adapters.items():
+            session.mount(prefix, adapter)
         self._session = session
         self.username = username
 
@@ -508,7 +521,7 @@ class InstaloaderContext:
         .. versionchanged:: 4.13.1
            Removed the `rhx_gis` parameter.
         """
-        with copy_session(self._session, self.request_timeout) as tmpsession:
+        with self._session_copy() as tmpsession:
             tmpsession.headers.update(self._default_http_header(empty_session_only=True))
             del tmpsession.headers['Connection']
             del tmpsession.headers['Content-Length']
@@ -540,7 +553,7 @@ class InstaloaderContext:
         :param referer: HTTP Referer, or None.
         :return: The server's response dictionary.
         """
-        with copy_session(self._session, self.request_timeout) as tmpsession:
+        with self._session_copy() as tmpsession:
             tmpsession.headers.update(self._default_http_header(empty_session_only=True))
             del tmpsession.headers['Connection']
             del tmpsession.headers['Content-Length']
@@ -609,7 +622,7 @@ class InstaloaderContext:
         :raises ConnectionException: When query repeatedly failed.
 
         .. versionadded:: 4.2.1"""
-        with copy_session(self._session, self.request_timeout) as tempsession:
+        with self._session_copy() as tempsession:
             # Set headers to simulate an API request from iPad
             tempsession.headers['ig-intended-user-id'] = str(self.user_id)
             tempsession.headers['x-pigeon-rawclienttime'] = '{:.6f}'.format(time.time())
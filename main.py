@@ -1,17 +1,42 @@
 import os
+import re
 import time
-import uuid
-import shutil
+import random
+import secrets
+import zipfile
+import tempfile
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
-from typing import Optional, List
-
-from fastapi import FastAPI, HTTPException, Response
+from typing import IO, Dict, Iterator, Optional, List, Tuple, Union
+from urllib.parse import urlparse
+
+import httpx
+import orjson
+import redis.asyncio as aioredis
+from cachetools import LRUCache, TTLCache
+from redis.exceptions import RedisError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from limits import parse as parse_limit
 from pydantic import BaseModel
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+from starlette.background import BackgroundTask
 
 import instaloader
 from instaloader.exceptions import (
-    BadResponseException,
+    AbortDownloadException,
+    ConnectionException,
     QueryReturnedNotFoundException,
+    TooManyRequestsException,
 )
 
 # ----------------------------------------------------------
@@ -24,38 +49,160 @@ BASE_DIR = Path(__file__).resolve().parent
 SESSION_DIR = BASE_DIR / "instaloader"
 SESSION_FILE = SESSION_DIR / f"session-{INSTAGRAM_USER}"
 
-L = instaloader.Instaloader()
+# Cache de /post_info compartilhado entre os workers (opcional: sem REDIS_URL,
+# fica só o cache em memória de cada processo).
+REDIS_URL = os.environ.get("REDIS_URL")
+REDIS_PREFIX = "ig-cache"
+# Redis fora do ar não pode segurar a requisição: desiste rápido e cai no cache local.
+REDIS_SOCKET_TIMEOUT = 1.0
+REDIS_CONNECT_TIMEOUT = 2.0
+
+# Credenciais das rotas de operação (/health/deep, DELETE /cache); sem elas, ficam desligadas.
+HEALTH_USER = os.environ.get("HEALTH_USER")
+HEALTH_PASSWORD = os.environ.get("HEALTH_PASSWORD")
+
+MIME_BY_SUFFIX = {
+    ".mp4": "video/mp4",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+class _NoSleepRateController(instaloader.RateController):
+    """Não deixa o Instaloader dormir na thread do pool (time.sleep de até ~20 min
+    num 429, segurando uma vaga do IG_SEMAPHORE): levanta TooManyRequestsException
+    e quem espera é o get_post_with_retry, em asyncio."""
+
+    def sleep(self, secs: float):
+        raise TooManyRequestsException(f"Rate limit: o Instaloader pediu {secs:.0f}s de espera.")
+
+
+L = instaloader.Instaloader(rate_controller=_NoSleepRateController)
+
+# Limita quantas chamadas bloqueantes ao Instagram rodam ao mesmo tempo,
+# para não estourar o rate limit (429) com muitas requisições paralelas.
+IG_MAX_WORKERS = 16
+EXECUTOR = ThreadPoolExecutor(max_workers=IG_MAX_WORKERS, thread_name_prefix="instaloader")
+
+# Máximo de consultas simultâneas ao Instagram (Post.from_shortcode), em toda a aplicação.
+IG_MAX_CONCURRENCY = 8
+IG_SEMAPHORE = asyncio.Semaphore(IG_MAX_CONCURRENCY)
+
+def _mount_connection_pool():
+    """Pool de conexões maior na sessão do Instaloader (retries ficam com get_post_with_retry)."""
+    L.context._session.mount(
+        "https://",
+        HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=Retry(total=0)),
+    )
+
+
+_mount_connection_pool()
+
+# Último resultado de test_login(): (time.monotonic() da checagem, usuário).
+LOGIN_CHECK_TTL = 60
+_last_login_check: Tuple[float, Optional[str]] = (float("-inf"), None)
+
+redis_client: Optional[aioredis.Redis] = None
 
 # ----------------------------------------------------------
 # CARREGAR SESSÃO (MAS NÃO TRAVAR SE DER ERRO)
 # ----------------------------------------------------------
 
-print("------------------------------------------------------")
-print("Tentando carregar sessão do Instagram...")
-print("Caminho esperado:", SESSION_FILE)
-print("Existe o arquivo?", SESSION_FILE.exists())
-print("------------------------------------------------------")
-
-SESSION_LOADED = False
-
-try:
-    if SESSION_FILE.exists():
-        L.load_session_from_file(INSTAGRAM_USER, str(SESSION_FILE))
-        user = L.test_login()
-        if user:
-            print("Sessão carregada com sucesso. Logado como:", user)
-            SESSION_LOADED = True
-        else:
-            print("⚠️ Sessão carregada, mas test_login() retornou None.")
-    else:
+# Não 5s: inclui o test_login(), que vai ao Instagram, e antes de cada consulta
+# o Instaloader ainda faz do_sleep() (pausa aleatória de até 15s).
+SESSION_LOAD_TIMEOUT = 15.0
+
+
+def _load_session() -> Optional[str]:
+    """Carrega a sessão salva e devolve o usuário logado (None se não houver sessão)."""
+    if not SESSION_FILE.exists():
         print("⚠️ Arquivo de sessão não encontrado.")
+        return None
+
+    # load_session troca a sessão do Instaloader, mas monta nela os adapters (o pool)
+    # da sessão atual antes da troca: consultas anônimas em andamento não ficam sem pool.
+    L.load_session_from_file(INSTAGRAM_USER, str(SESSION_FILE))
+
+    user = L.test_login()
+    if user:
+        print("Sessão carregada com sucesso. Logado como:", user)
+    else:
+        print("⚠️ Sessão carregada, mas test_login() retornou None.")
+    return user
+
+
+def _apply_session(app: FastAPI, user: Optional[str]):
+    global _last_login_check
+
+    _last_login_check = (time.monotonic(), user)
+    app.state.session_loaded = user is not None
+    app.state.logged_as = user
 
-except Exception as e:
-    print("⚠️ Erro ao carregar sessão:", e)
 
-print("------------------------------------------------------")
-print("STATUS FINAL DA SESSÃO:", SESSION_LOADED)
-print("------------------------------------------------------")
+def _apply_late_session(app: FastAPI, load: asyncio.Future):
+    """Sessão que terminou de carregar depois do SESSION_LOAD_TIMEOUT: passa a valer agora."""
+    if load.cancelled():
+        return
+    if load.exception() is not None:
+        print("⚠️ Erro ao carregar sessão:", load.exception())
+        return
+    _apply_session(app, load.result())
+    print("Sessão carregada com atraso. STATUS:", app.state.session_loaded)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global redis_client
+
+    print("------------------------------------------------------")
+    print("Tentando carregar sessão do Instagram...")
+    print("Caminho esperado:", SESSION_FILE)
+    print("Existe o arquivo?", SESSION_FILE.exists())
+    print("------------------------------------------------------")
+
+    app.state.session_loaded = False
+    app.state.logged_as = None
+
+    # shield: no timeout a thread não para; o resultado é aplicado quando ela terminar.
+    load = asyncio.ensure_future(run_in_thread(_load_session))
+    try:
+        _apply_session(app, await asyncio.wait_for(asyncio.shield(load), timeout=SESSION_LOAD_TIMEOUT))
+
+    except asyncio.TimeoutError:
+        print(f"⚠️ Sessão não carregou em {SESSION_LOAD_TIMEOUT:.0f}s; segue anônimo até terminar.")
+        load.add_done_callback(functools.partial(_apply_late_session, app))
+
+    except Exception as e:
+        print("⚠️ Erro ao carregar sessão:", e)
+
+    print("------------------------------------------------------")
+    print("STATUS FINAL DA SESSÃO:", app.state.session_loaded)
+    print("------------------------------------------------------")
+
+    # Cliente HTTP compartilhado para baixar as mídias direto do CDN do Instagram.
+    # Criado aqui (e não no import) para cada lifespan ter o seu, aberto.
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        timeout=httpx.Timeout(30.0),
+        headers={"User-Agent": L.context.user_agent},
+        follow_redirects=True,
+    )
+
+    if REDIS_URL:
+        redis_client = aioredis.from_url(
+            REDIS_URL,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        )
+
+    yield
+
+    await app.state.http.aclose()
+    if redis_client is not None:
+        await redis_client.aclose()
+
 
 # ----------------------------------------------------------
 # FASTAPI
@@ -65,47 +212,206 @@ app = FastAPI(
     title="Instagram Downloader",
     description="Download de posts, reels e carrosséis usando Instaloader (com ou sem sessão)",
     version="1.0.0",
+    lifespan=lifespan,
+)
+
+# Limite por IP: protege a cota do Instagram, que é compartilhada pela sessão L.
+# /post_info e /post_info/batch gastam do mesmo limite de consultas (IG_LOOKUP_SCOPE).
+# Com REDIS_URL a contagem é uma só para todos os workers (em memória, cada worker
+# teria a sua e o limite se multiplicaria); se o Redis cair, volta para a memória.
+IG_LOOKUP_LIMIT = "10/minute"
+IG_LOOKUP_SCOPE = "ig_lookup"
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=REDIS_URL or "memory://",
+    storage_options={
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+    } if REDIS_URL else {},
+    in_memory_fallback_enabled=bool(REDIS_URL),
 )
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+
+# Máximo de downloads simultâneos no CDN, para não cair no rate limit.
+CDN_MAX_CONCURRENCY = 8
+CDN_SEMAPHORE = asyncio.Semaphore(CDN_MAX_CONCURRENCY)
 
 
 class PostRequest(BaseModel):
     url: str
 
 
+class BatchRequest(BaseModel):
+    urls: List[str]
+
+
+# Modelos de resposta: com response_model o FastAPI serializa direto pelo
+# pydantic (em Rust), sem passar pelo jsonable_encoder.
+class PostInfo(BaseModel):
+    shortcode: str
+    username: Optional[str]
+    caption: Optional[str]
+    is_video: bool
+    slides: int
+
+
+class BatchLookupError(BaseModel):
+    shortcode: str
+    error: str
+
+
+class BatchUrlError(BaseModel):
+    url: str
+    error: str
+
+
+class HealthStatus(BaseModel):
+    status: str
+    session_loaded: bool
+    logged_as: Optional[str]
+
+
+class CacheInvalidation(BaseModel):
+    shortcode: str
+    removed: bool
+
+
+MAX_BATCH_SIZE = 20
+
+
 # ----------------------------------------------------------
 # UTILITÁRIOS
 # ----------------------------------------------------------
 
-def shortcode_from_url(url: str) -> str:
-    """Extrai o shortcode da URL do Instagram."""
-    url = url.split("?")[0]
-    parts = [p for p in url.split("/") if p]
-    return parts[-1]
+SHORTCODE_RE = re.compile(r"/(?:p|reel|tv|reels)/([A-Za-z0-9_-]+)")
+
+
+def shortcode_from_url(url: str) -> Optional[str]:
+    """Extrai o shortcode da URL do Instagram (None se a URL não for de post)."""
+    m = SHORTCODE_RE.search(url)
+    return m.group(1) if m else None
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """Executa uma função bloqueante (Instaloader/requests) no pool de threads."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EXECUTOR, functools.partial(func, *args, **kwargs))
+
+
+def _media_suffix(url: str, is_video: bool) -> str:
+    """Extensão (minúscula) da mídia pela URL; se não for conhecida, .mp4/.jpg."""
+    suffix = Path(urlparse(url).path).suffix.lower()
+    if suffix in MIME_BY_SUFFIX:
+        return suffix
+    return ".mp4" if is_video else ".jpg"
+
+
+def _media_sources(post, shortcode: str) -> List[Tuple[str, str]]:
+    """Lista (nome do arquivo, URL no CDN) de cada mídia do post."""
+    # Propriedades do Post podem disparar consulta ao Instagram: lê cada uma uma vez só.
+    is_sidecar = post.typename == "GraphSidecar"
+
+    if is_sidecar:
+        sources = []
+        for i, node in enumerate(post.get_sidecar_nodes(), start=1):
+            is_video = node.is_video
+            url = node.video_url if is_video else node.display_url
+            sources.append((f"{shortcode}_{i}{_media_suffix(url, is_video)}", url))
+        return sources
+
+    is_video = post.is_video
+    url = post.video_url if is_video else post.url
+    return [(f"{shortcode}{_media_suffix(url, is_video)}", url)]
+
+
+ZIP_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
+def _iter_file(file: IO[bytes]) -> Iterator[bytes]:
+    while chunk := file.read(STREAM_CHUNK_SIZE):
+        yield chunk
 
-def get_post_with_retry(shortcode: str, max_retries: int = 3):
+
+async def check_login() -> Optional[str]:
+    """Chama L.test_login() (vai ao Instagram) e atualiza o logged_as do /health."""
+    global _last_login_check
+
+    user = await run_in_thread(L.test_login)
+    _last_login_check = (time.monotonic(), user)
+    app.state.logged_as = user
+    return user
+
+
+async def login_cached() -> Optional[str]:
+    """Resultado de L.test_login(), reaproveitado por LOGIN_CHECK_TTL segundos."""
+    checked_at, user = _last_login_check
+    if time.monotonic() - checked_at < LOGIN_CHECK_TTL:
+        return user
+    return await check_login()
+
+
+BACKOFF_BASE = 30
+BACKOFF_MAX = 300
+
+# Até quando (time.monotonic()) ninguém deve consultar o Instagram, depois de um rate limit.
+_ig_paused_until = float("-inf")
+
+
+def _backoff_wait(attempt: int) -> float:
+    """Espera antes da próxima tentativa: exponencial com jitter.
+
+    Não há Retry-After para respeitar: Post.from_shortcode não expõe os headers,
+    o 429 chega só como texto dentro da TooManyRequestsException."""
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def _is_rate_limited(err: ConnectionException) -> bool:
+    """TooManyRequestsException vem direto do _NoSleepRateController; depois de
+    max_connection_attempts, o get_json a embrulha numa ConnectionException."""
+    return isinstance(err, TooManyRequestsException) or isinstance(err.__cause__, TooManyRequestsException)
+
+
+async def _wait_instagram_pause():
+    """Segura a consulta enquanto o Instagram estiver em backoff (vale para todas as requisições)."""
+    while (delay := _ig_paused_until - time.monotonic()) > 0:
+        await asyncio.sleep(delay)
+
+
+async def get_post_with_retry(shortcode: str, max_retries: int = 3):
     """Tenta carregar o post com retry/backoff para rate limit."""
+    global _ig_paused_until
     last_err = None
 
     for attempt in range(max_retries):
+        await _wait_instagram_pause()
         try:
-            return instaloader.Post.from_shortcode(L.context, shortcode)
+            async with IG_SEMAPHORE:
+                return await run_in_thread(instaloader.Post.from_shortcode, L.context, shortcode)
 
-        except BadResponseException as e:
-            msg = str(e)
-            last_err = e
+        except QueryReturnedNotFoundException as e:
+            raise HTTPException(status_code=404, detail="Post não encontrado") from e
 
-            if "Please wait a few minutes" in msg:
-                wait = 30 * (attempt + 1)
-                print(f"[RATE LIMIT] Tentativa {attempt+1}/{max_retries}. Aguardando {wait}s...")
-                time.sleep(wait)
-                continue
+        except ConnectionException as e:
+            if not _is_rate_limited(e):
+                raise
+            last_err = e
 
+            wait = _backoff_wait(attempt)
+            _ig_paused_until = max(_ig_paused_until, time.monotonic() + wait)
+            print(f"[RATE LIMIT] Tentativa {attempt+1}/{max_retries}. Aguardando {wait:.0f}s...")
+            continue
+
+        except AbortDownloadException:
+            # Com sessão logada, o Instagram derrubar o login vira AbortDownloadException
+            # (LoginRequiredException só aparece sem login). Atualiza o logged_as do
+            # /health, no máximo uma vez por LOGIN_CHECK_TTL; anônimo não gasta cota.
+            if app.state.session_loaded:
+                await login_cached()
             raise
 
-        except QueryReturnedNotFoundException as e:
-            raise HTTPException(status_code=404, detail="Post não encontrado") from e
-
     raise HTTPException(
         status_code=429,
         detail="Instagram bloqueou temporariamente. Tente novamente."
@@ -113,28 +419,83 @@ def get_post_with_retry(shortcode: str, max_retries: int = 3):
 
 
 # ----------------------------------------------------------
-# ENDPOINTS
+# CACHE
 # ----------------------------------------------------------
 
-@app.get("/health")
-def health():
-    return {
-        "status": "ok",
-        "session_loaded": SESSION_LOADED,
-        "logged_as": L.test_login() if SESSION_LOADED else None
-    }
+POST_CACHE_TTL = 300
+MEDIA_CACHE_MAX_BYTES = 256 * 1024 * 1024
+MEDIA_CACHE_MAX_ITEM_BYTES = 16 * 1024 * 1024
 
+# Posts já carregados, por shortcode (evita nova ida ao Instagram).
+_post_cache: TTLCache = TTLCache(maxsize=4096, ttl=POST_CACHE_TTL)
 
-@app.post("/post_info")
-def post_info(req: PostRequest):
-    shortcode = shortcode_from_url(req.url)
+# Mídias já baixadas, por (shortcode, índice), limitadas pelo total de bytes.
+_media_cache: LRUCache = LRUCache(maxsize=MEDIA_CACHE_MAX_BYTES, getsizeof=lambda item: len(item[1]))
+
+
+# Consultas em andamento, por shortcode: pedidos simultâneos do mesmo post
+# esperam a mesma consulta em vez de irem todos ao Instagram.
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def _load_post(shortcode: str):
+    post = await get_post_with_retry(shortcode)
+    _post_cache[shortcode] = post
+    return post
+
+
+def _inflight_done(shortcode: str, fut: asyncio.Future):
+    _inflight.pop(shortcode, None)
+    # Marca a exceção como lida: se todos os clientes desistiram (shield), ninguém
+    # mais a recebe e o asyncio avisaria "Task exception was never retrieved".
+    if not fut.cancelled():
+        fut.exception()
 
+
+async def get_post_cached(shortcode: str):
+    """Devolve o post do cache ou carrega do Instagram (com retry)."""
+    post = _post_cache.get(shortcode)
+    if post is not None:
+        return post
+
+    fut = _inflight.get(shortcode)
+    if fut is None:
+        fut = asyncio.ensure_future(_load_post(shortcode))
+        _inflight[shortcode] = fut
+        fut.add_done_callback(functools.partial(_inflight_done, shortcode))
+
+    # shield: se um cliente desistir, a consulta segue para os demais.
+    return await asyncio.shield(fut)
+
+
+def _post_info_key(shortcode: str) -> str:
+    return f"{REDIS_PREFIX}:post_info:{shortcode}"
+
+
+async def _redis_post_dicts(shortcodes: List[str]) -> Dict[str, dict]:
+    """Respostas de /post_info já guardadas no Redis (por qualquer worker), num MGET só."""
+    if redis_client is None or not shortcodes:
+        return {}
     try:
-        post = get_post_with_retry(shortcode)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao ler post: {e}")
+        values = await redis_client.mget([_post_info_key(s) for s in shortcodes])
+    except RedisError as e:
+        print("⚠️ Erro ao ler do Redis:", e)
+        return {}
+    return {s: orjson.loads(v) for s, v in zip(shortcodes, values) if v is not None}
 
-    return {
+
+async def _fetch_post_dict(shortcode: str) -> dict:
+    """Monta a resposta de /post_info, usando o Redis (se houver) e o post em cache."""
+    if redis_client is not None:
+        try:
+            cached = await redis_client.get(_post_info_key(shortcode))
+            if cached is not None:
+                return orjson.loads(cached)
+        except RedisError as e:
+            print("⚠️ Erro ao ler do Redis:", e)
+
+    post = await get_post_cached(shortcode)
+    info = {
         "shortcode": shortcode,
         "username": post.owner_username,
         "caption": post.caption,
@@ -142,60 +503,249 @@ def post_info(req: PostRequest):
         "slides": post.mediacount,
     }
 
+    if redis_client is not None:
+        try:
+            await redis_client.set(_post_info_key(shortcode), orjson.dumps(info), ex=POST_CACHE_TTL)
+        except RedisError as e:
+            print("⚠️ Erro ao gravar no Redis:", e)
+
+    return info
+
+
+def _store_media(shortcode: str, index: int, item: Tuple[str, bytes]):
+    # Arquivos grandes não entram: um vídeo só esvaziaria boa parte do cache.
+    if len(item[1]) <= MEDIA_CACHE_MAX_ITEM_BYTES:
+        _media_cache[(shortcode, index)] = item
+
+
+async def _fetch_media(shortcode: str, index: int, name: str, url: str) -> Tuple[str, bytes]:
+    """Baixa uma mídia do CDN inteira para a memória (usado no ZIP do carrossel)."""
+    cached = _media_cache.get((shortcode, index))
+    if cached is not None:
+        return cached
+
+    async with CDN_SEMAPHORE:
+        resp = await app.state.http.get(url)
+    resp.raise_for_status()
+
+    item = (name, resp.content)
+    _store_media(shortcode, index, item)
+    return item
+
+
+async def _zip_carousel(shortcode: str, sources: List[Tuple[str, str]]) -> Tuple[IO[bytes], int]:
+    """Monta o ZIP do carrossel (sem compressão: JPEG/MP4 já são comprimidos).
+
+    Cada slide entra no ZIP assim que termina de baixar, sem esperar os demais.
+    Fica em memória até ZIP_SPOOL_MAX_BYTES; só carrosséis enormes vão para disco.
+    Devolve o arquivo já posicionado no início e o tamanho do ZIP."""
+    spool = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_BYTES)
+    tasks = [
+        asyncio.ensure_future(_fetch_media(shortcode, index, name, url))
+        for index, (name, url) in enumerate(sources)
+    ]
+
+    zf = zipfile.ZipFile(spool, "w", zipfile.ZIP_STORED)
+    try:
+        for fetched in asyncio.as_completed(tasks):
+            name, data = await fetched
+            await run_in_thread(zf.writestr, name, data)
+        await run_in_thread(zf.close)
+
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Fecha o ZIP antes do spool (senão o __del__ do ZipFile escreve em arquivo
+        # fechado); ValueError: um writestr cancelado ainda rodando na thread.
+        with suppress(ValueError):
+            zf.close()
+        spool.close()
+        raise
+
+    size = spool.tell()
+    spool.seek(0)
+    return spool, size
+
+
+async def _stream_media(shortcode: str, index: int, name: str, resp: httpx.Response):
+    """Repassa a mídia do CDN ao cliente e guarda no cache se for pequena."""
+    chunks: Optional[List[bytes]] = []
+    size = 0
+
+    async for chunk in resp.aiter_bytes(STREAM_CHUNK_SIZE):
+        if chunks is not None:
+            size += len(chunk)
+            if size <= MEDIA_CACHE_MAX_ITEM_BYTES:
+                chunks.append(chunk)
+            else:
+                chunks = None
+        yield chunk
+
+    if chunks is not None:
+        _store_media(shortcode, index, (name, b"".join(chunks)))
 
-@app.post("/download_post")
-def download_post(req: PostRequest):
-    shortcode = shortcode_from_url(req.url)
 
-    tmp = Path("/tmp") / f"ig-{uuid.uuid4()}"
-    tmp.mkdir(parents=True, exist_ok=True)
+# ----------------------------------------------------------
+# ENDPOINTS
+# ----------------------------------------------------------
+
+@app.get("/health", response_model=HealthStatus)
+async def health():
+    """Liveness: só o estado guardado na inicialização, sem ir ao Instagram."""
+    return {
+        "status": "ok",
+        "session_loaded": app.state.session_loaded,
+        "logged_as": app.state.logged_as,
+    }
+
+
+# auto_error=False: sem isso o HTTPBasic responde 401 antes do _require_ops rodar,
+# e a rota apareceria mesmo com HEALTH_USER/HEALTH_PASSWORD vazios.
+ops_basic = HTTPBasic(auto_error=False)
+
+
+def _require_ops(credentials: Optional[HTTPBasicCredentials] = Depends(ops_basic)):
+    if not (HEALTH_USER and HEALTH_PASSWORD):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if credentials is None:
+        user_ok = password_ok = False
+    else:
+        user_ok = secrets.compare_digest(credentials.username.encode(), HEALTH_USER.encode())
+        password_ok = secrets.compare_digest(credentials.password.encode(), HEALTH_PASSWORD.encode())
+    if not (user_ok and password_ok):
+        raise HTTPException(
+            status_code=401,
+            detail="Credenciais inválidas.",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+
+
+@app.get("/health/deep", response_model=HealthStatus, dependencies=[Depends(_require_ops)])
+async def health_deep():
+    """Checagem manual (não usar em probe): faz test_login() de verdade no Instagram."""
+    return {
+        "status": "ok",
+        "session_loaded": app.state.session_loaded,
+        "logged_as": await check_login(),
+    }
+
+
+@app.post("/post_info", response_model=PostInfo)
+@limiter.shared_limit(IG_LOOKUP_LIMIT, scope=IG_LOOKUP_SCOPE)
+async def post_info(request: Request, req: PostRequest):
+    shortcode = shortcode_from_url(req.url)
+    if shortcode is None:
+        raise HTTPException(status_code=400, detail="URL do Instagram inválida.")
 
     try:
-        post = get_post_with_retry(shortcode)
+        return await _fetch_post_dict(shortcode)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao ler post: {e}")
 
-        target = tmp / shortcode
-        target.mkdir(parents=True, exist_ok=True)
 
-        L.download_post(post, target=str(target))
+@app.post("/post_info/batch", response_model=List[Union[PostInfo, BatchLookupError, BatchUrlError]])
+@limiter.limit("2/minute")
+async def post_info_batch(request: Request, req: BatchRequest):
+    """Vários /post_info de uma vez; erros vêm por item, na mesma ordem das URLs."""
+    if len(req.urls) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BATCH_SIZE} URLs por lote.")
+
+    async def one(shortcode: str) -> dict:
+        if shortcode in stored:
+            return stored[shortcode]
+        try:
+            return await _fetch_post_dict(shortcode)
+        except HTTPException as e:
+            return {"shortcode": shortcode, "error": e.detail}
+        except Exception as e:
+            return {"shortcode": shortcode, "error": f"Erro ao ler post: {e}"}
+
+    shortcodes = [shortcode_from_url(url) for url in req.urls]
+    # Shortcodes repetidos no lote são consultados uma vez só.
+    unique = [s for s in dict.fromkeys(shortcodes) if s is not None]
+
+    # Cada shortcode fora do cache (Redis e memória) conta como um /post_info no
+    # limite por IP. test() antes do hit(): na janela fixa, um hit() recusado ainda
+    # gastaria o limite.
+    stored = await _redis_post_dicts(unique)
+    uncached = sum(1 for s in unique if s not in stored and s not in _post_cache)
+    lookup_limit = (parse_limit(IG_LOOKUP_LIMIT), get_remote_address(request), IG_LOOKUP_SCOPE)
+    if uncached and not (
+        limiter.limiter.test(*lookup_limit, cost=uncached)
+        and limiter.limiter.hit(*lookup_limit, cost=uncached)
+    ):
+        raise HTTPException(
+            status_code=429,
+            detail=f"Limite de {IG_LOOKUP_LIMIT} consultas ao Instagram excedido.",
+        )
+
+    results = dict(zip(unique, await asyncio.gather(*(one(s) for s in unique))))
+
+    return [
+        results[shortcode] if shortcode is not None
+        else {"url": url, "error": "URL do Instagram inválida."}
+        for url, shortcode in zip(req.urls, shortcodes)
+    ]
+
+
+@app.post("/download_post")
+@limiter.limit("3/minute")
+async def download_post(request: Request, req: PostRequest):
+    shortcode = shortcode_from_url(req.url)
+    if shortcode is None:
+        raise HTTPException(status_code=400, detail="URL do Instagram inválida.")
 
-        media_files: List[Path] = [
-            f for f in target.iterdir()
-            if f.suffix.lower() in [".mp4", ".jpg", ".jpeg", ".png", ".webp"]
-        ]
+    try:
+        post = await get_post_cached(shortcode)
+        sources = await run_in_thread(_media_sources, post, shortcode)
 
-        if not media_files:
+        if not sources:
             raise HTTPException(status_code=500, detail="Nenhuma mídia encontrada.")
 
         # CARROSSEL = ZIP
-        if len(media_files) > 1:
-            zip_path = tmp / f"{shortcode}.zip"
-            shutil.make_archive(str(zip_path.with_suffix("")), "zip", target)
-            data = zip_path.read_bytes()
+        if len(sources) > 1:
+            spool, size = await _zip_carousel(shortcode, sources)
 
-            return Response(
-                content=data,
+            return StreamingResponse(
+                _iter_file(spool),
                 media_type="application/zip",
                 headers={
-                    "Content-Disposition": f'attachment; filename="{shortcode}.zip"'
-                }
+                    "Content-Disposition": f'attachment; filename="{shortcode}.zip"',
+                    "Content-Length": str(size),
+                },
+                background=BackgroundTask(spool.close),
             )
 
         # APENAS 1 ARQUIVO
-        file = media_files[0]
-        data = file.read_bytes()
-
-        mimetype = {
-            ".mp4": "video/mp4",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-            ".webp": "image/webp",
-        }.get(file.suffix.lower(), "application/octet-stream")
-
-        return Response(
-            content=data,
+        name, url = sources[0]
+
+        mimetype = MIME_BY_SUFFIX.get(Path(name).suffix, "application/octet-stream")
+        headers = {"Content-Disposition": f'attachment; filename="{name}"'}
+
+        cached = _media_cache.get((shortcode, 0))
+        if cached is not None:
+            return Response(content=cached[1], media_type=mimetype, headers=headers)
+
+        http = app.state.http
+        resp = await http.send(http.build_request("GET", url), stream=True)
+        if resp.is_error:
+            await resp.aclose()
+            resp.raise_for_status()
+
+        # Repassa o tamanho para o cliente mostrar progresso (só vale sem compressão,
+        # pois aiter_bytes() entrega o conteúdo já descomprimido).
+        if "Content-Length" in resp.headers and "Content-Encoding" not in resp.headers:
+            headers["Content-Length"] = resp.headers["Content-Length"]
+
+        return StreamingResponse(
+            _stream_media(shortcode, 0, name, resp),
             media_type=mimetype,
-            headers={"Content-Disposition": f'attachment; filename="{file.name}"'}
+            headers=headers,
+            background=BackgroundTask(resp.aclose),
         )
 
     except HTTPException:
@@ -204,8 +754,20 @@ def download_post(req: PostRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao baixar: {e}")
 
-    finally:
+
+@app.delete("/cache/{shortcode}", response_model=CacheInvalidation, dependencies=[Depends(_require_ops)])
+async def invalidate_cache(shortcode: str):
+    """Remove do cache (memória e Redis) o post e as mídias de um shortcode."""
+    removed = _post_cache.pop(shortcode, None) is not None
+
+    for key in [k for k in _media_cache if k[0] == shortcode]:
+        del _media_cache[key]
+        removed = True
+
+    if redis_client is not None:
         try:
-            shutil.rmtree(tmp)
-        except:
-            pass
+            removed = bool(await redis_client.delete(_post_info_key(shortcode))) or removed
+        except RedisError as e:
+            print("⚠️ Erro ao apagar do Redis:", e)
+
+    return {"shortcode": shortcode, "removed": removed}
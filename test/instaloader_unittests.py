@@ -7,6 +7,8 @@ import unittest
 from itertools import islice
 from typing import Optional
 
+from requests.adapters import HTTPAdapter
+
 import instaloader
 
 PROFILE_WITH_HIGHLIGHTS = 325732271
@@ -26,6 +28,49 @@ EMPTY_PROFILE_ID = 1928659031
 ratecontroller: Optional[instaloader.RateController] = None
 
 
+class TestSessionCopy(unittest.TestCase):
+    """Offline tests of the per-query session copies (no requests to Instagram)."""
+
+    class TrackingAdapter(HTTPAdapter):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    def setUp(self):
+        self.context = instaloader.InstaloaderContext(quiet=True)
+        self.adapter = self.TrackingAdapter()
+        self.context._session.mount("https://", self.adapter)  # pylint:disable=protected-access
+
+    def tearDown(self):
+        self.context.close()
+
+    def test_copy_shares_connection_pool(self):
+        # pylint:disable=protected-access
+        with self.context._session_copy() as session:
+            self.assertIsNot(session, self.context._session)
+            self.assertIs(session.adapters["https://"], self.adapter)
+        self.assertFalse(self.adapter.closed)
+
+    def test_copy_has_own_headers_and_cookies(self):
+        # pylint:disable=protected-access
+        with self.context._session_copy() as session:
+            session.headers["X-Test"] = "1"
+            session.cookies.set("test", "1")
+        self.assertNotIn("X-Test", self.context._session.headers)
+        self.assertIsNone(self.context._session.cookies.get("test"))
+
+    def test_load_session_keeps_connection_pool(self):
+        # pylint:disable=protected-access
+        old_session = self.context._session
+        self.context.load_session("user", {"csrftoken": "token", "sessionid": "id"})
+        self.assertIsNot(self.context._session, old_session)
+        self.assertIs(self.context._session.adapters["https://"], self.adapter)
+        self.assertEqual(self.context._session.cookies.get("sessionid"), "id")
+        self.assertFalse(self.adapter.closed)
+
+
 class TestInstaloaderAnonymously(unittest.TestCase):
 
     def setUp(self):
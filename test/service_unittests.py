@@ -0,0 +1,305 @@
+"""Unit Tests for the FastAPI service in main.py (offline: Instagram is mocked)"""
+
+import asyncio
+import gc
+import time
+import unittest
+import zipfile
+from unittest import mock
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from requests import Response
+from requests.adapters import BaseAdapter
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+import main
+from instaloader.exceptions import ConnectionException, QueryReturnedNotFoundException, TooManyRequestsException
+
+
+def rate_limited_error() -> ConnectionException:
+    """What InstaloaderContext.get_json raises once it gives up on a 429."""
+    try:
+        raise TooManyRequestsException("429 Too Many Requests")
+    except TooManyRequestsException as err:
+        try:
+            raise ConnectionException("JSON Query to graphql/query: 429 Too Many Requests") from err
+        except ConnectionException as conn_err:
+            return conn_err
+
+
+class FakePost:
+    owner_username = "user"
+    caption = "legenda"
+    is_video = False
+    mediacount = 1
+
+
+class ServiceTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        main._post_cache.clear()
+        main._media_cache.clear()
+        main._ig_paused_until = float("-inf")
+        main.app.state.session_loaded = False
+        main.app.state.logged_as = None
+        self.from_shortcode = mock.patch.object(main.instaloader.Post, "from_shortcode").start()
+        mock.patch.object(main, "BACKOFF_BASE", 0.01).start()
+        self.addCleanup(mock.patch.stopall)
+
+
+class TestRetry(ServiceTestCase):
+
+    async def test_rate_limit_is_retried(self):
+        self.from_shortcode.side_effect = [rate_limited_error(), "post"]
+        self.assertEqual(await main.get_post_with_retry("abc"), "post")
+        self.assertEqual(self.from_shortcode.call_count, 2)
+        self.assertGreater(main._ig_paused_until, float("-inf"))
+
+    async def test_rate_limit_gives_up_with_429(self):
+        self.from_shortcode.side_effect = [rate_limited_error() for _ in range(3)]
+        with self.assertRaises(HTTPException) as cm:
+            await main.get_post_with_retry("abc", max_retries=3)
+        self.assertEqual(cm.exception.status_code, 429)
+        self.assertEqual(self.from_shortcode.call_count, 3)
+
+    async def test_other_connection_errors_are_not_retried(self):
+        self.from_shortcode.side_effect = ConnectionException("500 Internal Server Error")
+        with self.assertRaises(ConnectionException):
+            await main.get_post_with_retry("abc")
+        self.assertEqual(self.from_shortcode.call_count, 1)
+
+
+class TestPostInfo(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        mock.patch.object(main, "_load_session", return_value=None).start()
+
+    def test_rate_limit_and_not_found_reach_the_client(self):
+        url = {"url": "https://www.instagram.com/p/abc/"}
+        with TestClient(main.app) as client:
+            self.from_shortcode.side_effect = [rate_limited_error() for _ in range(3)]
+            self.assertEqual(client.post("/post_info", json=url).status_code, 429)
+            main.limiter.reset()
+            self.from_shortcode.side_effect = QueryReturnedNotFoundException("404 Not Found")
+            self.assertEqual(client.post("/post_info", json=url).status_code, 404)
+
+
+class TestCoalescing(ServiceTestCase):
+
+    async def test_concurrent_lookups_share_one_upstream_call(self):
+        def slow_lookup(context, shortcode):
+            time.sleep(0.05)
+            return FakePost()
+
+        self.from_shortcode.side_effect = slow_lookup
+        posts = await asyncio.gather(*(main.get_post_cached("abc") for _ in range(10)))
+        self.assertEqual(self.from_shortcode.call_count, 1)
+        self.assertTrue(all(post is posts[0] for post in posts))
+        self.assertNotIn("abc", main._inflight)
+
+    async def test_abandoned_failure_is_retrieved(self):
+        self.from_shortcode.side_effect = ConnectionException("500 Internal Server Error")
+        loop = asyncio.get_running_loop()
+        handler = mock.Mock()
+        loop.set_exception_handler(handler)
+        self.addCleanup(loop.set_exception_handler, None)
+
+        waiter = asyncio.ensure_future(main.get_post_cached("abc"))
+        await asyncio.sleep(0)
+        fut = main._inflight["abc"]
+        waiter.cancel()
+        await asyncio.wait([fut])  # waits without retrieving the exception
+        del fut, waiter
+        gc.collect()
+        handler.assert_not_called()
+
+
+class TooManyRequestsAdapter(BaseAdapter):
+    """Answers every request with 429, so the lookup goes through the real get_json path."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        resp = Response()
+        resp.status_code = 429
+        resp.reason = "Too Many Requests"
+        resp._content = b""
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+class TestInstaloader429(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        main._ig_paused_until = float("-inf")
+        main.app.state.session_loaded = False
+        self.adapter = TooManyRequestsAdapter()
+        context = main.L.context
+        mock.patch.dict(context._session.adapters, {"https://": self.adapter}).start()
+        mock.patch.object(context, "_rate_controller", main._NoSleepRateController(context)).start()
+        mock.patch.object(context, "sleep", False).start()
+        mock.patch.object(context, "quiet", True).start()
+        mock.patch.object(main, "BACKOFF_BASE", 0.01).start()
+        self.addCleanup(mock.patch.stopall)
+
+    async def test_429_does_not_block_the_worker_thread(self):
+        started = time.monotonic()
+        with self.assertRaises(HTTPException) as cm:
+            await main.get_post_with_retry("abc", max_retries=3)
+        self.assertEqual(cm.exception.status_code, 429)
+        self.assertLess(time.monotonic() - started, 5)
+        # Instaloader's own retry would reach Instagram again; the rate controller
+        # keeps later attempts local until its window has passed.
+        self.assertEqual(self.adapter.calls, 1)
+        self.assertGreater(main._ig_paused_until, time.monotonic() - 5)
+
+
+class TestLifespan(ServiceTestCase):
+
+    async def test_each_lifespan_gets_an_open_http_client(self):
+        with mock.patch.object(main, "_load_session", return_value=None):
+            for _ in range(2):
+                async with main.lifespan(main.app):
+                    self.assertFalse(main.app.state.http.is_closed)
+                self.assertTrue(main.app.state.http.is_closed)
+
+    async def test_slow_session_is_applied_when_it_finishes(self):
+        def slow_load():
+            time.sleep(0.2)
+            return "user"
+
+        with mock.patch.object(main, "_load_session", slow_load), \
+                mock.patch.object(main, "SESSION_LOAD_TIMEOUT", 0.01):
+            async with main.lifespan(main.app):
+                self.assertFalse(main.app.state.session_loaded)
+                for _ in range(100):
+                    if main.app.state.session_loaded:
+                        break
+                    await asyncio.sleep(0.01)
+                self.assertEqual(main.app.state.logged_as, "user")
+                self.assertTrue(main.app.state.session_loaded)
+
+
+class TestCarouselZip(ServiceTestCase):
+
+    async def test_slides_are_zipped_as_they_arrive(self):
+        # One event per slide, set in reverse order: the last slide finishes first,
+        # and each one releases the slide before it.
+        released = [asyncio.Event() for _ in range(3)]
+        released[-1].set()
+
+        async def fetch(shortcode, index, name, url):
+            await released[index].wait()
+            if index > 0:
+                released[index - 1].set()
+            return name, url.encode()
+
+        sources = [(f"abc_{i}.jpg", f"data{i}") for i in range(1, 4)]
+        with mock.patch.object(main, "_fetch_media", fetch):
+            spool, size = await main._zip_carousel("abc", sources)
+        with spool, zipfile.ZipFile(spool) as zf:
+            self.assertEqual(zf.namelist(), ["abc_3.jpg", "abc_2.jpg", "abc_1.jpg"])
+            self.assertEqual(zf.read("abc_1.jpg"), b"data1")
+            self.assertEqual(zf.fp.seek(0, 2), size)
+
+    async def test_failed_slide_cancels_the_others(self):
+        started = asyncio.Event()
+
+        async def fetch(shortcode, index, name, url):
+            if index == 0:
+                await started.wait()
+                raise RuntimeError("CDN")
+            started.set()
+            await asyncio.sleep(10)
+
+        sources = [("abc_1.jpg", "a"), ("abc_2.jpg", "b")]
+        with mock.patch.object(main, "_fetch_media", fetch):
+            with self.assertRaisesRegex(RuntimeError, "CDN"):
+                await asyncio.wait_for(main._zip_carousel("abc", sources), timeout=1)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis not installed")
+class TestRedisCache(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.from_shortcode.return_value = FakePost()
+        self.redis = fakeredis.FakeAsyncRedis()
+        mock.patch.object(main, "redis_client", self.redis).start()
+
+    async def asyncTearDown(self):
+        await self.redis.aclose()
+
+    async def test_miss_goes_to_instagram_and_stores_with_ttl(self):
+        info = await main._fetch_post_dict("abc")
+        self.assertEqual(info["username"], "user")
+        self.assertEqual(self.from_shortcode.call_count, 1)
+        ttl = await self.redis.ttl(main._post_info_key("abc"))
+        self.assertTrue(0 < ttl <= main.POST_CACHE_TTL)
+
+    async def test_hit_skips_instagram(self):
+        await main._fetch_post_dict("abc")
+        main._post_cache.clear()
+        self.assertEqual((await main._fetch_post_dict("abc"))["caption"], "legenda")
+        self.assertEqual(self.from_shortcode.call_count, 1)
+
+    async def test_batch_does_not_charge_redis_hits(self):
+        await main._fetch_post_dict("abc")
+        main._post_cache.clear()
+        request = mock.Mock(client=mock.Mock(host="10.0.0.1"), headers={}, scope={"type": "http"})
+        with mock.patch.object(main.limiter.limiter, "hit", return_value=True) as hit:
+            results = await main.post_info_batch.__wrapped__(
+                request, main.BatchRequest(urls=["https://www.instagram.com/p/abc/"] * 2 + ["x"])
+            )
+        hit.assert_not_called()
+        self.assertEqual(results[0]["caption"], "legenda")
+        self.assertEqual(results[2], {"url": "x", "error": "URL do Instagram inválida."})
+        self.assertEqual(self.from_shortcode.call_count, 1)
+
+    async def test_expired_entry_is_fetched_again(self):
+        await main._fetch_post_dict("abc")
+        main._post_cache.clear()
+        await self.redis.pexpire(main._post_info_key("abc"), 1)
+        await asyncio.sleep(0.01)
+        await main._fetch_post_dict("abc")
+        self.assertEqual(self.from_shortcode.call_count, 2)
+
+
+class TestOpsAuth(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        mock.patch.object(main, "_load_session", return_value=None).start()
+        mock.patch.object(main, "check_login", mock.AsyncMock(return_value=None)).start()
+
+    def test_disabled_without_credentials_configured(self):
+        with mock.patch.object(main, "HEALTH_USER", None), TestClient(main.app) as client:
+            self.assertEqual(client.get("/health/deep").status_code, 404)
+            self.assertEqual(client.delete("/cache/abc", auth=("ops", "x")).status_code, 404)
+
+    def test_requires_basic_auth_when_configured(self):
+        with mock.patch.object(main, "HEALTH_USER", "ops"), \
+                mock.patch.object(main, "HEALTH_PASSWORD", "secret"), \
+                TestClient(main.app) as client:
+            resp = client.get("/health/deep")
+            self.assertEqual(resp.status_code, 401)
+            self.assertEqual(resp.headers["WWW-Authenticate"], "Basic")
+            self.assertEqual(client.get("/health/deep", auth=("ops", "wrong")).status_code, 401)
+            self.assertEqual(client.get("/health/deep", auth=("ops", "secret")).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()